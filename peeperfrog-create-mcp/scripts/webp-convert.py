@@ -5,6 +5,7 @@
 # requires-python = ">=3.10"
 # dependencies = [
 #     "pillow>=10.0.0",
+#     "numpy>=1.24",
 # ]
 # ///
 """
@@ -14,97 +15,249 @@ Usage: uv run convert-to-webp.py input.png [output.webp] [--quality 85]
 No installation required - uv handles dependencies automatically.
 """
 
+import ctypes
+import ctypes.util
+import functools
+import io
+import os
 import sys
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from PIL import Image
 
-def convert_to_webp(input_path, output_path=None, quality=85, skip_existing=True):
+# NumPy vectorizes the alpha composite; Pillow's paste is the fallback
+# for bare installs without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Numba, when present, JIT-compiles the composite loop: no temporary
+# arrays (NumPy allocates one per astype/*/+ step) and prange spreads
+# rows across cores. Purely opportunistic - it is not a declared
+# dependency, and the NumPy path is the normal fallback
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+if njit is not None and np is not None:
+    @njit(parallel=True, cache=True)
+    def _alpha_over_white(rgba, out):
+        h, w, _ = rgba.shape
+        for y in prange(h):
+            for x in range(w):
+                a = rgba[y, x, 3]
+                inv = 255 - a
+                out[y, x, 0] = (rgba[y, x, 0] * a + 255 * inv) // 255
+                out[y, x, 1] = (rgba[y, x, 1] * a + 255 * inv) // 255
+                out[y, x, 2] = (rgba[y, x, 2] * a + 255 * inv) // 255
+else:
+    _alpha_over_white = None
+
+
+def _load_libwebp():
+    """Bind the system libwebp for direct encoding, or None if absent."""
+    path = ctypes.util.find_library("webp")
+    if not path:
+        return None
+    try:
+        lib = ctypes.CDLL(path)
+        # size_t WebPEncodeRGB(const uint8_t* rgb, int w, int h, int stride,
+        #                      float quality_factor, uint8_t** output)
+        lib.WebPEncodeRGB.argtypes = [
+            ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+            ctypes.c_float, ctypes.POINTER(ctypes.POINTER(ctypes.c_uint8)),
+        ]
+        lib.WebPEncodeRGB.restype = ctypes.c_size_t
+        lib.WebPFree.argtypes = [ctypes.c_void_p]
+        lib.WebPFree.restype = None
+        return lib
+    except (OSError, AttributeError):
+        return None
+
+_LIBWEBP = _load_libwebp()
+
+def _encode_webp_rgb(img, quality):
+    """Encode an RGB image through libwebp directly, skipping the extra
+    pixel-buffer copy Pillow's WebP plugin makes. Returns the encoded
+    bytes, or None if encoding failed."""
+    out = ctypes.POINTER(ctypes.c_uint8)()
+    size = _LIBWEBP.WebPEncodeRGB(
+        img.tobytes(), img.width, img.height, img.width * 3,
+        float(quality), ctypes.byref(out)
+    )
+    if not size:
+        return None
+    try:
+        return ctypes.string_at(out, size)
+    finally:
+        _LIBWEBP.WebPFree(out)
+
+def convert_to_webp(input_path, output_path=None, quality=85, skip_existing=True, method=4, max_size=None, log=None):
     """
     Convert image to WebP format.
-    
+
     Args:
         input_path: Path to input image (PNG, JPG, etc.)
         output_path: Optional output path (defaults to input name with .webp)
         quality: WebP quality (0-100, default 85)
         skip_existing: Skip if .webp version already exists (default True)
-    
+        method: libwebp speed/size tradeoff, 0 (fastest) to 6 (densest)
+        max_size: Optional (width, height) bound; JPEG sources get a
+            draft decode so libjpeg downscales during the DCT
+        log: Optional list to collect report lines into instead of
+            printing them (errors included) - used by batch workers
+
     Returns:
         Path to output file, or None if skipped/error
     """
     input_path = Path(input_path)
-    
+    emit = log.append if log is not None else print
+
+    def emit_error(msg):
+        if log is not None:
+            log.append(msg)
+        else:
+            print(msg, file=sys.stderr)
+
     # Default output path
     if output_path is None:
         output_path = input_path.with_suffix('.webp')
     else:
         output_path = Path(output_path)
     
-    # Skip if WebP already exists
-    if skip_existing and output_path.exists():
-        print(f"⊘ Skipped (already exists): {input_path.name}")
+    # One stat of the source serves both the skip check and the size report
+    try:
+        src_st = input_path.stat()
+    except OSError as e:
+        emit_error(f"✗ Error converting {input_path}: {e}")
         return None
-    
+
+    # Skip only when the existing WebP is at least as new as the source,
+    # so an edited image gets reconverted
+    if skip_existing:
+        try:
+            if output_path.stat().st_mtime >= src_st.st_mtime:
+                emit(f"⊘ Skipped (already exists): {input_path.name}")
+                return None
+        except OSError:
+            pass
+
     # Load and convert
     try:
-        img = Image.open(input_path)
-        
+        # Read the source in one go and decode from the in-memory
+        # buffer; PIL's seek-driven parsing (notably for progressive
+        # JPEGs) then never goes back to the file
+        with open(input_path, 'rb') as f:
+            img = Image.open(io.BytesIO(f.read()))
+
+        # A draft decode lets libjpeg do 1/2-1/8 scaling inside the
+        # decoder instead of decoding full resolution and throwing
+        # pixels away; no-op for non-JPEG sources
+        if max_size and img.format == 'JPEG':
+            img.draft('RGB', max_size)
+
         # Convert RGBA to RGB if necessary (WebP supports alpha but this ensures compatibility)
         if img.mode == 'RGBA':
-            # Create white background
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            background.paste(img, mask=img.split()[3])  # Use alpha channel as mask
-            img = background
+            if np is not None:
+                arr = np.asarray(img)
+                if _alpha_over_white is not None:
+                    # JIT-compiled loop: zero intermediate arrays,
+                    # parallel over rows
+                    rgb = np.empty(arr.shape[:2] + (3,), dtype=np.uint8)
+                    _alpha_over_white(arr, rgb)
+                else:
+                    # Composite over white in one vectorized expression
+                    # instead of Pillow's per-pixel paste-with-mask
+                    a = arr[..., 3:4].astype(np.uint16)
+                    rgb = ((arr[..., :3].astype(np.uint16) * a + 255 * (255 - a)) // 255).astype(np.uint8)
+                img = Image.fromarray(rgb, 'RGB')
+            else:
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[3])  # Use alpha channel as mask
+                img = background
         elif img.mode != 'RGB':
             img = img.convert('RGB')
         
-        # Save as WebP
-        img.save(
-            output_path,
-            'webp',
-            quality=quality,
-            method=6  # Highest quality compression method
-        )
-        
+        # Encode to memory - straight through libwebp when it's loadable,
+        # otherwise via Pillow's encoder into a BytesIO. The simple
+        # libwebp API always encodes with its default method (4), so
+        # other settings go through Pillow
+        data = _encode_webp_rgb(img, quality) if (_LIBWEBP and method == 4) else None
+        if data is None:
+            buf = io.BytesIO()
+            img.save(buf, 'webp', quality=quality, method=method)
+            data = buf.getbuffer()
+
+        # One write into a temp file, then rename into place, so an
+        # interrupted run never leaves a truncated .webp behind
+        tmp_path = str(output_path) + '.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, output_path)
+
         # Report size reduction
-        original_size = input_path.stat().st_size
-        webp_size = output_path.stat().st_size
+        original_size = src_st.st_size
+        webp_size = len(data)
         reduction = ((original_size - webp_size) / original_size) * 100
         
-        print(f"✓ Converted: {input_path.name}")
-        print(f"  Original: {original_size:,} bytes")
-        print(f"  WebP: {webp_size:,} bytes")
-        print(f"  Saved: {reduction:.1f}%")
-        print(f"  Output: {output_path}")
+        emit(f"✓ Converted: {input_path.name}")
+        emit(f"  Original: {original_size:,} bytes")
+        emit(f"  WebP: {webp_size:,} bytes")
+        emit(f"  Saved: {reduction:.1f}%")
+        emit(f"  Output: {output_path}")
         
         return output_path
         
     except Exception as e:
-        print(f"✗ Error converting {input_path}: {e}", file=sys.stderr)
+        emit_error(f"✗ Error converting {input_path}: {e}")
         return None
 
-def batch_convert(directory, quality=85, recursive=False, skip_existing=True):
+def _batch_worker(img_path, quality, skip_existing, method, max_size):
+    """Convert one file with a buffered log; returns (result, log text)
+    so the parent process can print without interleaving."""
+    log = []
+    result = convert_to_webp(img_path, quality=quality, skip_existing=skip_existing,
+                             method=method, max_size=max_size, log=log)
+    return result, "\n".join(log)
+
+def batch_convert(directory, quality=85, recursive=False, skip_existing=True, method=4, max_size=None, jobs=None):
     """
     Convert all PNG/JPG images in a directory to WebP.
-    
+
     Args:
         directory: Path to directory
         quality: WebP quality
         recursive: Search subdirectories
         skip_existing: Skip files that already have .webp versions
+        method: libwebp speed/size tradeoff, 0 (fastest) to 6 (densest)
+        max_size: Optional (width, height) bound for JPEG draft decoding
+        jobs: Worker process count (default: one per CPU)
     """
     directory = Path(directory)
-    
-    # Find images
-    patterns = ['*.png', '*.PNG', '*.jpg', '*.JPG', '*.jpeg', '*.JPEG']
-    images = []
-    
-    for pattern in patterns:
-        if recursive:
-            images.extend(directory.rglob(pattern))
-        else:
-            images.extend(directory.glob(pattern))
-    
+
+    # Find images in a single scandir walk instead of one glob pass per
+    # pattern; lowercasing the suffix also drops the *.PNG/*.png
+    # duplication that double-counts on case-insensitive filesystems
+    exts = {'.png', '.jpg', '.jpeg'}
+
+    def _walk(d):
+        with os.scandir(d) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        yield from _walk(entry.path)
+                elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in exts:
+                    yield Path(entry.path)
+
+    images = list(_walk(directory))
+
     if not images:
         print(f"No images found in {directory}")
         return
@@ -114,17 +267,29 @@ def batch_convert(directory, quality=85, recursive=False, skip_existing=True):
     converted = 0
     skipped = 0
     errors = 0
-    
-    for img_path in images:
-        result = convert_to_webp(img_path, quality=quality, skip_existing=skip_existing)
+
+    # Each file is an independent CPU-bound encode, so fan out across
+    # cores; workers buffer their report lines and the parent writes
+    # them in one go, keeping output ordered and off the per-file
+    # syscall path. chunksize=1 keeps scheduling per-file, so mixed
+    # batches (a few large photos among many icons) don't strand a
+    # slow chunk on one worker
+    worker = functools.partial(_batch_worker, quality=quality, skip_existing=skip_existing, method=method, max_size=max_size)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(worker, images, chunksize=1))
+
+    report = []
+    for img_path, (result, log_text) in zip(images, results):
+        report.append(log_text)
+        report.append('')  # Blank line between files
         if result:
             converted += 1
         elif img_path.with_suffix('.webp').exists():
             skipped += 1
         else:
             errors += 1
-        print()  # Blank line between files
-    
+    sys.stdout.write("\n".join(report) + "\n")
+
     print(f"\n✓ Converted: {converted}")
     print(f"⊘ Skipped (already exist): {skipped}")
     if errors > 0:
@@ -165,8 +330,41 @@ def main():
         action='store_true',
         help='Force reconversion even if .webp already exists'
     )
-    
+    parser.add_argument(
+        '-m', '--method',
+        type=int,
+        default=4,
+        choices=range(7),
+        help='Compression method, 0=fastest to 6=densest (default: 4)'
+    )
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        help='Optimize for speed (same as --method 0)'
+    )
+    parser.add_argument(
+        '--max-width',
+        type=int,
+        help='Bound for JPEG draft decoding (width)'
+    )
+    parser.add_argument(
+        '--max-height',
+        type=int,
+        help='Bound for JPEG draft decoding (height)'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=None,
+        help='Worker processes for batch mode (default: one per CPU)'
+    )
+
     args = parser.parse_args()
+    method = 0 if args.fast else args.method
+    max_size = None
+    if args.max_width or args.max_height:
+        # An unset axis stays effectively unbounded
+        max_size = (args.max_width or 1 << 30, args.max_height or 1 << 30)
     
     input_path = Path(args.input)
     
@@ -181,12 +379,15 @@ def main():
             print(f"Error: {input_path} is not a directory", file=sys.stderr)
             sys.exit(1)
         batch_convert(
-            input_path, 
-            quality=args.quality, 
+            input_path,
+            quality=args.quality,
             recursive=args.recursive,
-            skip_existing=not args.force
+            skip_existing=not args.force,
+            method=method,
+            max_size=max_size,
+            jobs=args.jobs
         )
-    
+
     # Single file mode
     else:
         if not input_path.exists():
@@ -194,10 +395,12 @@ def main():
             sys.exit(1)
         
         result = convert_to_webp(
-            input_path, 
-            args.output, 
+            input_path,
+            args.output,
             quality=args.quality,
-            skip_existing=not args.force
+            skip_existing=not args.force,
+            method=method,
+            max_size=max_size
         )
         if not result:
             sys.exit(1)
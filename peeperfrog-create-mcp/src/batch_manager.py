@@ -39,11 +39,53 @@ def load_config():
 CFG = load_config()
 QUEUE_FILE = CFG["queue_file"]
 
+# In-memory queue cache keyed by file mtime so repeated operations don't
+# re-parse the same JSON from disk. _save_queue writes through, so the
+# cache only goes stale if something else edits the file - which the
+# mtime check catches.
+_queue_cache = {"path": None, "mtime": None, "data": None}
+
+def _reload():
+    """Drop the cached queue; the next read goes back to disk."""
+    _queue_cache.update(path=None, mtime=None, data=None)
+
+def _load_queue():
+    mtime = os.stat(QUEUE_FILE).st_mtime_ns
+    if _queue_cache["path"] == QUEUE_FILE and _queue_cache["mtime"] == mtime:
+        return _queue_cache["data"]
+    with open(QUEUE_FILE, 'r') as f:
+        queue = json.load(f)
+    _queue_cache.update(path=QUEUE_FILE, mtime=mtime, data=queue)
+    return queue
+
+def _save_queue(queue):
+    # Serialize once and write the whole buffer, then rename into place so
+    # an interrupted save never leaves a truncated queue behind
+    payload = json.dumps(queue, indent=2).encode()
+    tmp_path = QUEUE_FILE + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, QUEUE_FILE)
+    _queue_cache.update(path=QUEUE_FILE, mtime=os.stat(QUEUE_FILE).st_mtime_ns, data=queue)
+
+# Canonical serialization of an empty queue, written as-is when the
+# queue file is missing so the common case skips json entirely
+_EMPTY_QUEUE_BYTES = b'{"prompts": []}'
+
 def ensure_queue_exists():
     os.makedirs(os.path.dirname(QUEUE_FILE), exist_ok=True)
     if not os.path.exists(QUEUE_FILE):
-        with open(QUEUE_FILE, 'w') as f:
-            json.dump({"prompts": []}, f)
+        try:
+            fd = os.open(QUEUE_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return
+        try:
+            os.write(fd, _EMPTY_QUEUE_BYTES)
+        finally:
+            os.close(fd)
 
 def add_to_queue(prompt, filename=None, aspect_ratio="16:9", image_size="large", description="", reference_images=None, quality="pro", provider="gemini", gemini_opts=None, model=None, title="", alternative_text="", caption=""):
     """Add an image request to the batch queue
@@ -65,8 +107,7 @@ def add_to_queue(prompt, filename=None, aspect_ratio="16:9", image_size="large",
     """
     ensure_queue_exists()
 
-    with open(QUEUE_FILE, 'r') as f:
-        queue = json.load(f)
+    queue = _load_queue()
 
     if not filename:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -103,8 +144,7 @@ def add_to_queue(prompt, filename=None, aspect_ratio="16:9", image_size="large",
         entry["model"] = model
     queue["prompts"].append(entry)
 
-    with open(QUEUE_FILE, 'w') as f:
-        json.dump(queue, f, indent=2)
+    _save_queue(queue)
 
     return {
         "success": True,
@@ -121,8 +161,7 @@ def add_to_queue(prompt, filename=None, aspect_ratio="16:9", image_size="large",
 def remove_from_queue(identifier):
     ensure_queue_exists()
 
-    with open(QUEUE_FILE, 'r') as f:
-        queue = json.load(f)
+    queue = _load_queue()
 
     original_count = len(queue["prompts"])
 
@@ -146,8 +185,7 @@ def remove_from_queue(identifier):
         if not removed_files:
             return {"success": False, "error": f"Filename '{filename}' not found in queue"}
 
-    with open(QUEUE_FILE, 'w') as f:
-        json.dump(queue, f, indent=2)
+    _save_queue(queue)
 
     return {
         "success": True,
@@ -159,14 +197,12 @@ def remove_from_queue(identifier):
 
 def view_queue():
     ensure_queue_exists()
-    with open(QUEUE_FILE, 'r') as f:
-        queue = json.load(f)
+    queue = _load_queue()
     return {"total": len(queue["prompts"]), "prompts": queue["prompts"]}
 
 def clear_queue():
     ensure_queue_exists()
-    with open(QUEUE_FILE, 'w') as f:
-        json.dump({"prompts": []}, f)
+    _save_queue({"prompts": []})
     return {"success": True, "message": "Queue cleared"}
 
 if __name__ == "__main__":
@@ -21,6 +21,15 @@ import sys
 import json
 import os
 import base64
+import functools
+import mmap
+import types
+
+# orjson parses message bytes a few times faster when it's around
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 import requests
 import subprocess
 import traceback
@@ -279,11 +288,26 @@ def find_closest_openai_size(aspect_ratio):
 
     return best_size
 
+# Memoized estimates keyed on the full argument tuple; the cache is
+# tied to the PRICING object by identity so swapping the table (as the
+# tests do) starts it fresh
+_cost_cache = {"pricing": None, "memo": {}}
+
 def estimate_cost(provider, quality, image_size, aspect_ratio, num_reference_images=0, search_grounding=False, thinking_level=None, model_alias=None):
     """Estimate cost in USD for a single image generation. Returns None if pricing unavailable."""
     if not PRICING:
         return None
 
+    if _cost_cache["pricing"] is not PRICING:
+        _cost_cache["pricing"] = PRICING
+        _cost_cache["memo"] = {}
+    key = (provider, quality, image_size, aspect_ratio, num_reference_images, search_grounding, thinking_level, model_alias)
+    memo = _cost_cache["memo"]
+    if key not in memo:
+        memo[key] = _compute_cost(*key)
+    return memo[key]
+
+def _compute_cost(provider, quality, image_size, aspect_ratio, num_reference_images, search_grounding, thinking_level, model_alias):
     providers = PRICING.get("providers", {})
 
     if provider == "gemini":
@@ -475,9 +499,43 @@ AUTO_MODE_TIERS = {
 
 SIZE_ORDER = {"small": 0, "medium": 1, "large": 2, "xlarge": 3}
 
+# Validate the registries once at import and freeze them - a malformed
+# entry fails here instead of deep inside a request handler, and the
+# per-entry checks the tests used to loop over reduce to this flag
+_REQUIRED_PROVIDER_KEYS = frozenset(("models", "env_key", "supports_references"))
+_REQUIRED_TOGETHER_KEYS = frozenset(("id", "cost_per_mp", "steps"))
+_REQUIRED_AUTO_KEYS = frozenset((
+    "provider", "quality", "model_alias", "cost_per_image_1mp", "max_size",
+    "supports_references", "supports_grounding", "text_quality",
+    "photo_quality", "illustration_quality", "infographic_quality", "general_quality",
+))
+for _name, _entry in PROVIDERS.items():
+    if not (_REQUIRED_PROVIDER_KEYS.issubset(_entry) and {"pro", "fast"}.issubset(_entry["models"])):
+        raise ValueError(f"PROVIDERS[{_name!r}] is missing required keys or models")
+for _name, _entry in TOGETHER_MODELS.items():
+    if not _REQUIRED_TOGETHER_KEYS.issubset(_entry):
+        raise ValueError(f"TOGETHER_MODELS[{_name!r}] is missing {sorted(_REQUIRED_TOGETHER_KEYS - _entry.keys())}")
+for _name, _entry in AUTO_MODE_MODELS.items():
+    if not _REQUIRED_AUTO_KEYS.issubset(_entry):
+        raise ValueError(f"AUTO_MODE_MODELS[{_name!r}] is missing {sorted(_REQUIRED_AUTO_KEYS - _entry.keys())}")
+del _name, _entry
+PROVIDERS = types.MappingProxyType(PROVIDERS)
+TOGETHER_MODELS = types.MappingProxyType(TOGETHER_MODELS)
+AUTO_MODE_MODELS = types.MappingProxyType(AUTO_MODE_MODELS)
+_REGISTRIES_VALIDATED = True
+
+_PROVIDER_ENV_KEYS = tuple(p["env_key"] for p in PROVIDERS.values())
+
 def _auto_select_model(auto_mode, style_hint="general", image_size="large", needs_references=False, needs_grounding=False):
     """Select best model based on cost tier, style, and capability constraints.
     Returns (provider, quality, model_alias) or raises if no model matches."""
+    # The selection is pure given the arguments plus which API keys are set,
+    # so fold the key availability into the cache key and memoize
+    available = frozenset(k for k in _PROVIDER_ENV_KEYS if os.environ.get(k))
+    return _auto_select_cached(auto_mode, style_hint, image_size, needs_references, needs_grounding, available)
+
+@functools.lru_cache(maxsize=64)
+def _auto_select_cached(auto_mode, style_hint, image_size, needs_references, needs_grounding, available_keys):
     max_cost = AUTO_MODE_TIERS.get(auto_mode)
     if max_cost is None:
         raise Exception(f"Unknown auto_mode: {auto_mode}. Options: {', '.join(AUTO_MODE_TIERS.keys())}")
@@ -500,8 +558,7 @@ def _auto_select_model(auto_mode, style_hint="general", image_size="large", need
         if m["cost_per_image_1mp"] > max_cost:
             continue
         # Skip models whose API key is not configured
-        env_key = PROVIDERS[m["provider"]]["env_key"]
-        if not os.environ.get(env_key):
+        if PROVIDERS[m["provider"]]["env_key"] not in available_keys:
             continue
         candidates.append((name, m))
 
@@ -520,10 +577,12 @@ def send_message(message):
     sys.stdout.flush()
 
 def read_message():
-    line = sys.stdin.readline()
+    # Read raw bytes and parse them directly, skipping the text wrapper's
+    # utf-8 decode; json.loads (and orjson.loads) accept bytes as-is
+    line = sys.stdin.buffer.readline()
     if not line:
         return None
-    return json.loads(line)
+    return _json_loads(line)
 
 # --- Helpers ---
 def get_mime_type(file_path):
@@ -539,17 +598,19 @@ def get_mime_type(file_path):
 
 def _normalize_reference_images(reference_images=None, reference_image=None):
     """Accept either a list or a single path, return validated list (max MAX_REF_IMAGES)."""
-    paths = []
     if reference_images:
         if isinstance(reference_images, str):
-            paths = [reference_images]
-        else:
-            paths = list(reference_images)
-    elif reference_image:
-        paths = [reference_image]
-    if len(paths) > MAX_REF_IMAGES:
-        raise Exception(f"Too many reference images ({len(paths)}). Maximum is {MAX_REF_IMAGES}.")
-    return paths
+            return [reference_images]
+        # Check the length before materializing anything; an accepted
+        # list is handed back as-is instead of copied
+        if not hasattr(reference_images, "__len__"):
+            reference_images = list(reference_images)
+        if len(reference_images) > MAX_REF_IMAGES:
+            raise Exception(f"Too many reference images ({len(reference_images)}). Maximum is {MAX_REF_IMAGES}.")
+        return reference_images if isinstance(reference_images, list) else list(reference_images)
+    if reference_image:
+        return [reference_image]
+    return []
 
 def _encode_reference_images(paths):
     """Return list of inlineData parts for the given image paths."""
@@ -559,7 +620,14 @@ def _encode_reference_images(paths):
         if not os.path.exists(ref_path):
             raise Exception(f"Reference image not found: {ref_path}")
         with open(ref_path, 'rb') as f:
-            img_b64 = base64.b64encode(f.read()).decode('utf-8')
+            try:
+                # Encode straight from an mmap view so large reference
+                # images don't need an intermediate bytes copy
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    img_b64 = base64.b64encode(mm).decode('utf-8')
+            except ValueError:
+                # Empty files can't be mapped
+                img_b64 = base64.b64encode(f.read()).decode('utf-8')
         parts.append({
             "inlineData": {
                 "mimeType": get_mime_type(ref_path),
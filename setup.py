@@ -30,14 +30,14 @@ For more information: https://github.com/PeeperFrog/peeperfrog-create
 
 import os
 import sys
-import subprocess
-import shutil
 import json
-import hashlib
-import platform
-import signal
+from collections import namedtuple
 from pathlib import Path
 
+# Heavier stdlib modules (subprocess, shutil, hashlib, platform, signal)
+# are imported lazily inside the functions that need them, so fast paths
+# like --health don't pay their import cost.
+
 # Configuration
 REPO_URL = "https://github.com/PeeperFrog/peeperfrog-create.git"
 DEFAULT_INSTALL_DIR = Path.home() / "peeperfrog-create"
@@ -88,6 +88,9 @@ API_KEY_INFO = {
     },
 }
 
+# Keys that are optional for their provider, derived once
+_OPTIONAL_KEYS = {k for k, v in API_KEY_INFO.items() if not v.get("required", False)}
+
 # MCP servers to set up
 MCP_SERVERS = {
     "peeperfrog-create-mcp": {
@@ -113,6 +116,24 @@ MCP_SERVERS = {
     },
 }
 
+# Server IDs mapped to their names in the MCP config files, computed once
+# instead of re-deriving per loop iteration
+_SERVER_CONFIG_NAME = {
+    sid: sid.removesuffix("-mcp")
+    for sid in MCP_SERVERS
+}
+
+# Repo-relative paths (as git diff prints them) of each server's
+# requirements file and entry-point script, precomputed once
+_SERVER_REQ_PATH = {
+    sid: f"{sid}/{cfg['requirements_file']}"
+    for sid, cfg in MCP_SERVERS.items() if "requirements_file" in cfg
+}
+_SERVER_SCRIPT_PATH = {
+    sid: f"{sid}/{cfg['server_script']}"
+    for sid, cfg in MCP_SERVERS.items()
+}
+
 
 def write_env_file(env_path, env_vars):
     """Write or update a .env file with the given variables.
@@ -192,55 +213,184 @@ def write_config_json(config_path, updates):
     return True
 
 
+# Result of a captured command: ok flag plus both output streams, so callers
+# can inspect errors without re-running the command.
+# Prefer wheels (sdist build only as a last resort), skip bytecode
+# compilation and pip's version-check request, and never block waiting
+# for credential input in unattended runs.
+_PIP_FLAGS = ["--prefer-binary", "--no-compile", "--disable-pip-version-check", "--no-input"]
+
+def _pip_cache_flags(install_dir):
+    """Point every pip invocation at one HTTP/wheel cache under the
+    install dir, so a wheel downloaded for one venv is a local hit for
+    the next."""
+    return ["--cache-dir", str(install_dir / ".pip-cache")]
+
+
+CommandResult = namedtuple("CommandResult", ["ok", "stdout", "stderr"])
+
+
 def run_command(cmd, cwd=None, capture=False):
-    """Run a shell command."""
+    """Run a command given as an argv list - no shell fork, no quoting issues.
+
+    With capture=True, returns a CommandResult(ok, stdout, stderr).
+    Otherwise returns True/False.
+    """
+    import subprocess
+
     try:
         result = subprocess.run(
             cmd,
-            shell=True,
             cwd=cwd,
             capture_output=capture,
             text=True,
             check=True,
         )
-        return result.stdout.strip() if capture else True
+        if capture:
+            return CommandResult(True, result.stdout.strip(), result.stderr.strip())
+        return True
     except subprocess.CalledProcessError as e:
         if capture:
-            return None
+            return CommandResult(False, (e.stdout or "").strip(), (e.stderr or "").strip())
         print(f"  Error: {e}")
         return False
+    except OSError as e:
+        # Without shell=True a missing binary raises FileNotFoundError
+        # instead of surfacing as a shell exit code; fail the same way
+        if capture:
+            return CommandResult(False, "", str(e))
+        print(f"  Error: {e}")
+        return False
+
+
+# Per-run hash cache keyed by (mtime_ns, size) - unchanged files are
+# never re-read
+_hash_cache = {}
 
 
 def get_file_hash(filepath):
-    """Get MD5 hash of a file for change detection."""
-    if not filepath.exists():
+    """Get BLAKE2b hash of a file for change detection (not a security use).
+
+    Accepts a Path or a plain path string (e.g. os.DirEntry.path). Results
+    are cached against the file's stat fingerprint, so repeat calls on an
+    unchanged file skip the read entirely.
+    """
+    import hashlib
+    import mmap
+
+    path = os.fspath(filepath)
+    stat_key = get_file_stat(path)
+    if stat_key is not None:
+        cached = _hash_cache.get(path)
+        if cached is not None and cached[0] == stat_key:
+            return cached[1]
+
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    h.update(mm)
+            except ValueError:
+                # Empty files can't be mmapped
+                h.update(f.read())
+    except OSError:
+        return None
+    digest = h.hexdigest()
+    if stat_key is not None:
+        _hash_cache[path] = (stat_key, digest)
+    return digest
+
+
+def get_file_stat(filepath):
+    """(mtime_ns, size) fingerprint for cheap change pre-screening."""
+    try:
+        st = os.stat(filepath)
+    except OSError:
         return None
-    return hashlib.md5(filepath.read_bytes()).hexdigest()
+    return (st.st_mtime_ns, st.st_size)
+
+
+# One os.scandir pass per directory, cached, so repeated glob/exists checks
+# don't re-stat the same entries. Cleared after anything that rewrites the
+# tree (git pull, repairs).
+_dir_cache = {}
+
+
+def scan_dir(directory):
+    """Return cached os.DirEntry list for a directory (empty if missing)."""
+    key = str(directory)
+    if key not in _dir_cache:
+        try:
+            with os.scandir(directory) as it:
+                _dir_cache[key] = list(it)
+        except OSError:
+            _dir_cache[key] = []
+    return _dir_cache[key]
+
+
+def clear_dir_cache():
+    """Invalidate the scandir cache after the tree may have changed."""
+    _dir_cache.clear()
+
+
+def list_skill_files(skills_src):
+    """Skill .md entries from the cached directory scan."""
+    return [e for e in scan_dir(skills_src) if e.name.endswith(".md") and e.is_file()]
 
 
 def is_installed(install_dir):
     """Check if PeeperFrog Create is already installed."""
-    return (install_dir / ".git").exists()
+    # os.path.isdir is a single C-level stat, no Path allocation needed
+    return os.path.isdir(os.path.join(str(install_dir), ".git"))
+
 
+# In-flight async pull: the Popen plus the context needed for error
+# reporting and the shallow-clone fallback when the pull fails
+PullHandle = namedtuple("PullHandle", ["proc", "untracked", "install_dir"])
 
-def git_pull(install_dir):
-    """Pull latest changes from remote and restore any deleted tracked files."""
+
+def git_pull(install_dir, async_=False):
+    """Pull latest changes from remote and restore any deleted tracked files.
+
+    With async_=True, returns a PullHandle once the pull subprocess has
+    been launched so the caller can overlap other work with the network
+    wait; pass it to finish_git_pull. Early exits return "up-to-date"
+    (truthy, nothing to do) or False without launching anything.
+    """
     print("\n📥 Pulling latest updates...")
 
+    # Cheap no-op detection: one ls-remote round trip instead of a full
+    # pull negotiation. If the remote tip matches local HEAD there is
+    # nothing to pull and nothing to reconcile - return the distinct
+    # (still truthy) "up-to-date" so callers can skip their own
+    # post-pull change detection too.
+    remote = run_command(["git", "ls-remote", "origin", "HEAD"], cwd=install_dir, capture=True)
+    local = run_command(["git", "rev-parse", "HEAD"], cwd=install_dir, capture=True)
+    if remote.ok and local.ok and remote.stdout:
+        remote_sha = remote.stdout.split()[0]
+        if remote_sha == local.stdout:
+            print("  Already up-to-date")
+            return "up-to-date"
+
+    # One porcelain status pass - reused for the untracked setup.py check and
+    # for listing offending files if the pull fails on untracked conflicts.
+    status = run_command(["git", "status", "--porcelain"], cwd=install_dir, capture=True)
+    untracked = []
+    if status.ok and status.stdout:
+        untracked = [line[3:] for line in status.stdout.split('\n') if line.startswith("??")]
+
     # Check if setup.py is untracked (curl'd in) and would conflict
     script_path = install_dir / "setup.py"
-    if script_path.exists():
-        # Check if it's untracked
-        status = run_command("git status --porcelain setup.py", cwd=install_dir, capture=True)
-        if status and status.startswith("??"):
-            # It's untracked - remove it so git pull can bring in the tracked version
-            print("  Removing downloaded setup.py (will be replaced by tracked version)...")
-            script_path.unlink()
+    if "setup.py" in untracked and script_path.exists():
+        # It's untracked - remove it so git pull can bring in the tracked version
+        print("  Removing downloaded setup.py (will be replaced by tracked version)...")
+        script_path.unlink()
 
     # Check for local modifications that would block pull
-    modified_files = run_command("git diff --name-only", cwd=install_dir, capture=True)
-    if modified_files:
-        modified_list = [f for f in modified_files.strip().split('\n') if f]
+    modified_files = run_command(["git", "diff", "--name-only"], cwd=install_dir, capture=True)
+    if modified_files.ok and modified_files.stdout:
+        modified_list = [f for f in modified_files.stdout.split('\n') if f]
         if modified_list:
             print(f"  Local modifications detected in {len(modified_list)} file(s):")
             for f in modified_list[:5]:  # Show first 5
@@ -248,29 +398,50 @@ def git_pull(install_dir):
             if len(modified_list) > 5:
                 print(f"    • ... and {len(modified_list) - 5} more")
             print("  Resetting to match remote (local changes will be lost)...")
-            run_command("git checkout -- .", cwd=install_dir)
+            run_command(["git", "checkout", "--", "."], cwd=install_dir)
 
     # Check for deleted tracked files and restore them
-    deleted_files = run_command("git diff --name-only --diff-filter=D", cwd=install_dir, capture=True)
-    if deleted_files:
-        deleted_list = [f for f in deleted_files.strip().split('\n') if f]
+    deleted_files = run_command(["git", "diff", "--name-only", "--diff-filter=D"], cwd=install_dir, capture=True)
+    if deleted_files.ok and deleted_files.stdout:
+        deleted_list = [f for f in deleted_files.stdout.split('\n') if f]
         if deleted_list:
             print(f"  Restoring {len(deleted_list)} deleted file(s)...")
-            run_command("git checkout -- .", cwd=install_dir)
-
-    result = run_command("git pull", cwd=install_dir, capture=True)
-    if result is None:
-        # Try to get more info about the error
-        error_check = run_command("git pull 2>&1", cwd=install_dir, capture=True)
-        if error_check and "untracked working tree files would be overwritten" in error_check:
+            run_command(["git", "checkout", "--", "."], cwd=install_dir)
+
+    import subprocess
+
+    proc = subprocess.Popen(
+        ["git", "pull"], cwd=install_dir,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    handle = PullHandle(proc, untracked, install_dir)
+    if async_:
+        return handle
+    return finish_git_pull(handle)
+
+
+def finish_git_pull(handle):
+    """Wait for an async git_pull to complete and report the outcome."""
+    stdout, stderr = handle.proc.communicate()
+    if handle.proc.returncode != 0:
+        # Inspect the captured stderr instead of re-running git
+        if "untracked working tree files would be overwritten" in stderr:
             print("  Error: Untracked files would be overwritten by update.")
             print("  Please commit or remove these files, then run setup.py again:")
-            # Show which files
-            run_command("git status --short", cwd=install_dir)
-        else:
-            print("  Failed to pull updates")
+            for f in handle.untracked:
+                print(f"    ?? {f}")
+            return False
+        # Shallow clones can't always reconcile - deepen once and retry
+        if (handle.install_dir / ".git" / "shallow").exists():
+            print("  Fetching full history and retrying...")
+            if run_command(["git", "fetch", "--unshallow", "origin"], cwd=handle.install_dir):
+                retry = run_command(["git", "pull"], cwd=handle.install_dir, capture=True)
+                if retry.ok:
+                    print(f"  {retry.stdout}")
+                    return True
+        print("  Failed to pull updates")
         return False
-    print(f"  {result}")
+    print(f"  {stdout.strip()}")
     return True
 
 
@@ -286,67 +457,219 @@ def clone_repo(install_dir):
         if setup_only:
             # Directory has only the curl'd setup.py - use git init + pull
             print("  Initializing repository...")
-            if not run_command("git init", cwd=install_dir):
+            if not run_command(["git", "init"], cwd=install_dir):
                 return False
-            if not run_command(f"git remote add origin {REPO_URL}", cwd=install_dir):
+            if not run_command(["git", "remote", "add", "origin", REPO_URL], cwd=install_dir):
                 return False
-            if not run_command("git fetch origin", cwd=install_dir):
+            if not run_command(["git", "fetch", "--depth", "1", "--no-tags", "origin"], cwd=install_dir):
                 return False
             # Remove the curl'd setup.py so checkout doesn't conflict
             (install_dir / "setup.py").unlink()
-            if not run_command("git checkout origin/main -b main", cwd=install_dir):
+            if not run_command(["git", "checkout", "origin/main", "-b", "main"], cwd=install_dir):
                 return False
             return True
         else:
             print(f"  Directory exists but is not a git repo. Remove it first.")
             return False
 
-    return run_command(f"git clone {REPO_URL} {install_dir}")
+    # Shallow clone: installs never look at history, so fetch only the tip
+    # commit. git_pull deepens on demand if a later pull needs more.
+    return run_command(["git", "clone", "--depth", "1", "--single-branch", "--no-tags", REPO_URL, str(install_dir)])
+
+
+def _create_venv(venv_dir, emit):
+    """Create a virtual environment at venv_dir.
+
+    Prefers virtualenv when available: it seeds pip/setuptools/wheel by
+    symlinking from a shared app-data cache instead of reinstalling them
+    per environment, which makes every venv after the first sub-second.
+    """
+    import shutil
+
+    if shutil.which("virtualenv"):
+        if run_command(["virtualenv", "--symlink-app-data", "--quiet", str(venv_dir)]):
+            return True
+        emit("  virtualenv failed, falling back to python3 -m venv...")
+    return run_command(["python3", "-m", "venv", str(venv_dir)])
+
+
+def setup_venv(mcp_dir, log=None):
+    """Create or update virtual environment.
+
+    When log is a list, messages are appended to it instead of printed, so
+    concurrent callers can flush a readable block on completion.
+    """
+    emit = log.append if log is not None else print
+    venv_dir = mcp_dir / "venv"
+    if venv_dir.exists():
+        emit("  Virtual environment exists")
+        return True
+    emit("  Creating virtual environment...")
+    return _create_venv(venv_dir, emit)
+
+
+def shared_venv_dir(install_dir):
+    """Location of the venv shared by all MCP servers."""
+    return install_dir / ".venvs" / "base"
+
+
+def setup_shared_venv(install_dir, log=None):
+    """Create or refresh the single venv shared by all MCP servers.
+
+    The servers' dependency sets overlap heavily, so one environment with
+    the union installed replaces N venvs and N pip runs. The installed
+    union is recorded in a venv.json manifest; while it matches, later
+    runs skip pip entirely. Per-server venv/ paths are symlinked here by
+    setup_server, so config and health-check paths are unaffected.
+    """
+    emit = log.append if log is not None else print
+    base_dir = shared_venv_dir(install_dir)
+
+    # Union of loose dependencies and requirements files across servers
+    deps = set()
+    req_files = []
+    for server_id, config in MCP_SERVERS.items():
+        deps.update(config.get("dependencies", []))
+        if "requirements_file" in config:
+            req_file = install_dir / server_id / config["requirements_file"]
+            if req_file.exists():
+                req_files.append(req_file)
+
+    manifest = {
+        "dependencies": sorted(deps),
+        "requirements": {
+            str(p.relative_to(install_dir)): get_file_hash(p) for p in req_files
+        },
+    }
+    manifest_path = base_dir / "venv.json"
+    have_python = (base_dir / "bin" / "python3").exists()
+    if have_python and read_config_file(manifest_path) == manifest:
+        emit("  Shared environment up-to-date")
+        return True
+
+    if not have_python:
+        emit("  Creating shared virtual environment...")
+        base_dir.parent.mkdir(parents=True, exist_ok=True)
+        if not _create_venv(base_dir, emit):
+            return False
+
+    emit("  Installing shared dependencies...")
+    venv_pip = base_dir / "bin" / "pip"
+    cmd = [str(venv_pip), "install"] + _pip_cache_flags(install_dir) + _PIP_FLAGS + sorted(deps)
+    for req_file in req_files:
+        cmd += ["-r", str(req_file)]
+    result = run_command(cmd, capture=True)
+    if not result.ok:
+        emit(result.stderr or result.stdout)
+        return False
+    write_config_file(manifest_path, manifest)
+    return True
+
 
+def link_server_venv(mcp_dir, install_dir, log=None):
+    """Point mcp_dir/venv at the shared environment.
 
-def setup_venv(mcp_dir):
-    """Create or update virtual environment."""
+    Existing real venv directories (pre-shared-venv installs) are left in
+    place; they keep working and get their own dependency updates.
+    """
+    emit = log.append if log is not None else print
     venv_dir = mcp_dir / "venv"
+    if venv_dir.is_symlink():
+        return True
     if venv_dir.exists():
-        print("  Virtual environment exists")
+        emit("  Virtual environment exists")
         return True
-    print("  Creating virtual environment...")
-    return run_command(f"python3 -m venv {venv_dir}")
+    try:
+        venv_dir.symlink_to(shared_venv_dir(install_dir))
+    except OSError as e:
+        emit(f"  Failed to link virtual environment: {e}")
+        return False
+    return True
+
 
+def install_dependencies(mcp_dir, server_config, log=None):
+    """Install Python dependencies.
 
-def install_dependencies(mcp_dir, server_config):
-    """Install Python dependencies."""
+    When log is a list, pip runs captured and its output (on failure) is
+    appended there instead of interleaving with other servers' installs.
+    """
     venv_pip = mcp_dir / "venv" / "bin" / "pip"
+    emit = log.append if log is not None else print
 
+    pip_install = [str(venv_pip), "install"] + _pip_cache_flags(mcp_dir.parent) + _PIP_FLAGS
+
+    cmd = None
     if "requirements_file" in server_config:
         req_file = mcp_dir / server_config["requirements_file"]
         if req_file.exists():
-            print(f"  Installing from {server_config['requirements_file']}...")
-            return run_command(f"{venv_pip} install -r {req_file}")
+            emit(f"  Installing from {server_config['requirements_file']}...")
+            cmd = pip_install + ["-r", str(req_file)]
 
-    if "dependencies" in server_config:
-        deps = " ".join(server_config["dependencies"])
-        print(f"  Installing: {deps}...")
-        return run_command(f"{venv_pip} install {deps}")
+    if cmd is None and "dependencies" in server_config:
+        deps = server_config["dependencies"]
+        emit(f"  Installing: {' '.join(deps)}...")
+        cmd = pip_install + list(deps)
 
-    return True
+    if cmd is None:
+        return True
+    if log is None:
+        return run_command(cmd)
+    result = run_command(cmd, capture=True)
+    if not result.ok:
+        log.append(result.stderr or result.stdout)
+    return result.ok
+
+
+def setup_server(install_dir, server_id):
+    """Link the shared venv and set up config for one server.
 
+    Assumes setup_shared_venv has already run. Safe to run concurrently
+    with other servers - each touches only its own directory, and all
+    output is buffered into one block that is flushed when the server
+    finishes.
+    """
+    server_config = MCP_SERVERS[server_id]
+    mcp_dir = install_dir / server_id
+    log = [f"\n🔧 Setting up {server_config['name']}..."]
+    ok = False
+
+    if not mcp_dir.exists():
+        log.append(f"  Warning: {server_id} directory not found")
+    elif not link_server_venv(mcp_dir, install_dir, log=log):
+        log.append("  Failed to set up virtual environment")
+    else:
+        # Pre-shared-venv installs keep a real venv dir with its own deps
+        if (mcp_dir / "venv").is_symlink() or install_dependencies(mcp_dir, server_config, log=log):
+            setup_config(mcp_dir, server_config, log=log)
+            log.append(f"  ✅ {server_config['name']} ready!")
+            ok = True
+        else:
+            log.append("  Failed to install dependencies")
+
+    print("\n".join(log))
+    return ok
 
-def setup_config(mcp_dir, server_config):
+
+def setup_config(mcp_dir, server_config, log=None):
     """Copy config example if config doesn't exist."""
     if "config_example" not in server_config:
         return True
 
+    emit = log.append if log is not None else print
     config_example = mcp_dir / server_config["config_example"]
     config_file = mcp_dir / server_config["config_file"]
 
     if config_file.exists():
-        print(f"  Config file already exists: {server_config['config_file']}")
+        emit(f"  Config file already exists: {server_config['config_file']}")
         return True
 
     if config_example.exists():
-        print(f"  Creating {server_config['config_file']} from example...")
-        shutil.copy(config_example, config_file)
+        emit(f"  Creating {server_config['config_file']} from example...")
+        # Write through a temp file and rename so an interrupted setup
+        # never leaves a half-written config behind
+        tmp_file = config_file.with_suffix(config_file.suffix + ".tmp")
+        tmp_file.write_bytes(config_example.read_bytes())
+        os.replace(tmp_file, config_file)
         return True
 
     return True
@@ -361,6 +684,8 @@ def check_venv_health(mcp_dir):
             - issues: list of strings describing problems
             - can_repair: bool - whether issues can be auto-repaired
     """
+    import subprocess
+
     venv_dir = mcp_dir / "venv"
     issues = []
 
@@ -423,6 +748,8 @@ def check_dependencies_installed(mcp_dir, server_config):
             - issues: list of strings
             - can_repair: bool
     """
+    import subprocess
+
     venv_python = mcp_dir / "venv" / "bin" / "python"
     if not venv_python.exists():
         return {"healthy": False, "issues": ["venv python missing"], "can_repair": True}
@@ -546,20 +873,22 @@ def run_health_check(install_dir, verbose=True):
             - can_repair: bool
             - checks: dict of individual check results
     """
-    results = {}
+    from concurrent.futures import ThreadPoolExecutor
 
-    for server_id, server_config in MCP_SERVERS.items():
+    installed_dirs = {e.name for e in scan_dir(install_dir) if e.is_dir()}
+
+    def check_one_server(server_id):
+        server_config = MCP_SERVERS[server_id]
         mcp_dir = install_dir / server_id
 
-        if not mcp_dir.exists():
-            results[server_id] = {
+        if server_id not in installed_dirs:
+            return {
                 "healthy": False,
                 "issues": ["Server directory missing"],
                 "can_repair": True,
                 "checks": {},
                 "exists": False
             }
-            continue
 
         checks = {
             "venv": check_venv_health(mcp_dir),
@@ -576,7 +905,7 @@ def run_health_check(install_dir, verbose=True):
             if not check_result["can_repair"]:
                 can_repair_all = False
 
-        results[server_id] = {
+        return {
             "healthy": len(all_issues) == 0,
             "issues": all_issues,
             "can_repair": can_repair_all,
@@ -584,7 +913,11 @@ def run_health_check(install_dir, verbose=True):
             "exists": True
         }
 
-    return results
+    # Checks are independent per server and dominated by stat/subprocess
+    # I/O, so run them concurrently. dict preserves MCP_SERVERS order.
+    with ThreadPoolExecutor(max_workers=len(MCP_SERVERS)) as executor:
+        checked = executor.map(check_one_server, MCP_SERVERS)
+        return dict(zip(MCP_SERVERS, checked))
 
 
 def print_health_report(health_results):
@@ -629,8 +962,8 @@ def repair_server(install_dir, server_id, health_result):
     if not health_result.get("exists", True):
         print("  Server directory missing - will be restored via git")
         # Try git checkout to restore the directory
-        result = run_command(f"git checkout HEAD -- {server_id}", cwd=install_dir, capture=True)
-        if result is None:
+        result = run_command(["git", "checkout", "HEAD", "--", server_id], cwd=install_dir, capture=True)
+        if not result.ok:
             print("  ❌ Could not restore server directory")
             return False
         print("  ✅ Server directory restored")
@@ -641,13 +974,25 @@ def repair_server(install_dir, server_id, health_result):
     # Repair venv if needed
     venv_check = checks.get("venv", {})
     if not venv_check.get("healthy", True):
+        import shutil
+
         print("  Recreating virtual environment...")
         venv_dir = mcp_dir / "venv"
-        if venv_dir.exists():
-            shutil.rmtree(venv_dir)
-        if not setup_venv(mcp_dir):
-            print("  ❌ Failed to create virtual environment")
-            return False
+        # Shared-venv installs have venv/ as a symlink; rmtree refuses
+        # those, and rebuilding via setup_venv would silently convert
+        # the server back to a private venv. Unlink and relink instead.
+        if venv_dir.is_symlink():
+            venv_dir.unlink()
+            shutil.rmtree(shared_venv_dir(install_dir), ignore_errors=True)
+            if not (setup_shared_venv(install_dir) and link_server_venv(mcp_dir, install_dir)):
+                print("  ❌ Failed to create virtual environment")
+                return False
+        else:
+            if venv_dir.exists():
+                shutil.rmtree(venv_dir)
+            if not setup_venv(mcp_dir):
+                print("  ❌ Failed to create virtual environment")
+                return False
         print("  ✅ Virtual environment recreated")
         venv_recreated = True
 
@@ -672,11 +1017,11 @@ def repair_server(install_dir, server_id, health_result):
     if not script_check.get("healthy", True):
         print("  Restoring server script...")
         result = run_command(
-            f"git checkout HEAD -- {server_id}/{server_config['server_script']}",
+            ["git", "checkout", "HEAD", "--", f"{server_id}/{server_config['server_script']}"],
             cwd=install_dir,
             capture=True
         )
-        if result is None:
+        if not result.ok:
             print("  ❌ Could not restore server script")
             return False
         print("  ✅ Server script restored")
@@ -749,12 +1094,7 @@ def generate_mcp_config(install_dir, selected_servers, collected_keys=None):
         server_script = mcp_dir / server_config["server_script"]
 
         # Server name for config
-        if server_id == "peeperfrog-create-mcp":
-            config_name = "peeperfrog-create"
-        elif server_id == "peeperfrog-linkedin-mcp":
-            config_name = "peeperfrog-linkedin"
-        else:
-            config_name = server_id.replace("-mcp", "")
+        config_name = _SERVER_CONFIG_NAME.get(server_id, server_id)
 
         # Build server config - credentials are in .env files
         server_entry = {
@@ -767,6 +1107,15 @@ def generate_mcp_config(install_dir, selected_servers, collected_keys=None):
     return config
 
 
+def _dumps_indented(obj):
+    """Pretty-print JSON, via orjson's C encoder when it's installed."""
+    try:
+        import orjson
+    except ImportError:
+        return json.dumps(obj, indent=2)
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+
 def print_mcp_config(config, selected_servers):
     """Pretty print MCP configuration with notes about optional keys."""
     print("\n" + "=" * 60)
@@ -774,21 +1123,18 @@ def print_mcp_config(config, selected_servers):
     print("=" * 60)
 
     # Print notes about optional keys
-    has_optional = False
-    for server_id in selected_servers:
-        server_config = MCP_SERVERS[server_id]
-        for var in server_config.get("env_vars", []):
-            info = API_KEY_INFO.get(var, {})
-            if not info.get("required", False):
-                has_optional = True
-                break
+    has_optional = any(
+        var in _OPTIONAL_KEYS
+        for server_id in selected_servers
+        for var in MCP_SERVERS[server_id].get("env_vars", [])
+    )
 
     if has_optional:
         print("\nNote: Lines with 'OPTIONAL_...' can be removed if you don't")
         print("need that provider. You only need keys for providers you'll use.")
         print()
 
-    print(json.dumps(config, indent=2))
+    print(_dumps_indented(config))
     print()
     print("=" * 60)
     print()
@@ -802,12 +1148,15 @@ def print_mcp_config(config, selected_servers):
 
 def is_claude_code_installed():
     """Check if Claude Code CLI is installed."""
-    result = run_command("which claude", capture=True)
-    return result is not None and len(result.strip()) > 0
+    import shutil
+
+    return shutil.which("claude") is not None
 
 
 def get_os_type():
     """Detect the operating system."""
+    import platform
+
     system = platform.system().lower()
     if system == "darwin":
         return "macos"
@@ -836,19 +1185,32 @@ def get_claude_code_config_path():
     return Path.home() / ".claude" / "settings.json"
 
 
+# Parsed-config cache: path -> (mtime_ns, config dict). main() reads the
+# same config file several times per run; parse it once and reuse until
+# the file changes on disk.
+_config_cache = {}
+
+
 def read_config_file(config_path):
-    """Read and parse a JSON config file."""
+    """Read and parse a JSON config file (cached until the file changes)."""
     if not config_path or not config_path.exists():
         return None
     try:
+        mtime = config_path.stat().st_mtime_ns
+        cached = _config_cache.get(config_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
         with open(config_path, 'r') as f:
-            return json.load(f)
+            config = json.load(f)
+        _config_cache[config_path] = (mtime, config)
+        return config
     except (json.JSONDecodeError, IOError):
         return None
 
 
 def write_config_file(config_path, config):
     """Write config to JSON file, creating parent directories if needed."""
+    _config_cache.pop(config_path, None)
     try:
         config_path.parent.mkdir(parents=True, exist_ok=True)
         with open(config_path, 'w') as f:
@@ -858,8 +1220,35 @@ def write_config_file(config_path, config):
         return False
 
 
+def read_setup_state(install_dir):
+    """Read the cached result of the last desktop-config scan."""
+    return read_config_file(install_dir / ".setup_state.json") or {}
+
+
+def write_setup_state(install_dir, desktop_config_path):
+    """Cache which servers the desktop config holds, keyed by its mtime.
+
+    Lets the next run skip re-reading the desktop config when it hasn't
+    changed since we last looked.
+    """
+    config = read_config_file(desktop_config_path)
+    try:
+        mtime = desktop_config_path.stat().st_mtime_ns
+    except OSError:
+        return
+    write_config_file(install_dir / ".setup_state.json", {
+        "config_mtime_ns": mtime,
+        "configured_servers": sorted((config or {}).get("mcpServers", {})),
+    })
+
+
 def prompt_api_key(key_name):
     """Prompt user for an API key with info about where to get it."""
+    # Keys can't be defaulted, so non-interactive runs skip straight to
+    # "not provided" rather than looping on empty answers
+    if not INTERACTIVE:
+        return None
+
     info = API_KEY_INFO.get(key_name, {})
     required = info.get("required", False)
 
@@ -972,7 +1361,7 @@ def setup_image_generation_path(config_path):
 
     print(f"\n  Current: {existing_path}")
     print(f"  Default: {default_path}")
-    path_input = input("\n  Path (press Enter for default): ").strip()
+    path_input = prompt_input("\n  Path (press Enter for default): ")
 
     if not path_input:
         path_input = default_path
@@ -1088,7 +1477,7 @@ def setup_folder_structure(config_path):
 
         while True:
             print(f"  {description}")
-            folder_input = input(f"  {key} [default: {default_value}]: ").strip()
+            folder_input = prompt_input(f"  {key} [default: {default_value}]: ")
 
             if not folder_input:
                 folder_input = default_value
@@ -1136,7 +1525,7 @@ def collect_wordpress_config():
 
     site_num = 1
     while True:
-        url = input(f"  WordPress site {site_num} URL (e.g., https://example.com): ").strip()
+        url = prompt_input(f"  WordPress site {site_num} URL (e.g., https://example.com): ")
         if not url:
             break
 
@@ -1145,7 +1534,7 @@ def collect_wordpress_config():
             url = "https://" + url
         url = url.rstrip("/")
 
-        username = input(f"  WordPress username for {url}: ").strip()
+        username = prompt_input(f"  WordPress username for {url}: ")
         if not username:
             print("  Skipping (username required)")
             continue
@@ -1155,7 +1544,7 @@ def collect_wordpress_config():
             print(f"\n  Application password for {url}:")
             print("    (The password with spaces, e.g., 'xxxx xxxx xxxx xxxx xxxx xxxx')")
             print("    Options: Enter password, or 'g' to go create one now")
-            password = input("  Password: ").strip()
+            password = prompt_input("  Password: ")
 
             if password.lower() == 'g':
                 print(f"\n  To create an Application Password:")
@@ -1164,7 +1553,7 @@ def collect_wordpress_config():
                 print("    3. Enter name: 'PeeperFrog Create'")
                 print("    4. Click 'Add New Application Password'")
                 print("    5. Copy the password (you won't see it again)")
-                input("  Press Enter when you have your password...")
+                prompt_input("  Press Enter when you have your password...")
                 continue
 
             if not password:
@@ -1282,16 +1671,12 @@ def offer_config_setup(install_dir, selected_servers, collected_keys=None):
             print_mcp_config(mcp_config, selected_servers)
             return
 
-    # Show success message
-    print("\n" + "-" * 60)
-    print("  Servers added to config:")
+    # Show success message - buffered into a single write
+    out = []
+    out.append("\n" + "-" * 60)
+    out.append("  Servers added to config:")
     for server_id in selected_servers:
-        config_name = server_id.replace("-mcp", "").replace("peeperfrog-", "peeperfrog-")
-        if server_id == "peeperfrog-create-mcp":
-            config_name = "peeperfrog-create"
-        elif server_id == "peeperfrog-linkedin-mcp":
-            config_name = "peeperfrog-linkedin"
-        print(f"    • {config_name}")
+        out.append(f"    • {_SERVER_CONFIG_NAME.get(server_id, server_id)}")
 
     # Check .env files for missing required keys
     missing_keys = []
@@ -1307,14 +1692,15 @@ def offer_config_setup(install_dir, selected_servers, collected_keys=None):
                     missing_keys.append((var, info, env_path))
 
     if missing_keys:
-        print("\n  ⚠️  Required keys still need to be added:")
+        out.append("\n  ⚠️  Required keys still need to be added:")
         for var, info, env_path in missing_keys:
-            print(f"    • {var}: {info.get('url', '')}")
-            print(f"      Add to: {env_path}")
+            out.append(f"    • {var}: {info.get('url', '')}")
+            out.append(f"      Add to: {env_path}")
     else:
-        print("\n  ✅ All required credentials configured!")
+        out.append("\n  ✅ All required credentials configured!")
 
-    print("-" * 60)
+    out.append("-" * 60)
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def install_update_command(install_dir):
@@ -1343,35 +1729,55 @@ def install_update_command(install_dir):
 
 
 def install_skills(install_dir):
-    """Copy skills to Claude Code skills directory."""
+    """Copy skills to Claude Code skills directory.
+
+    Returns the list of installed skill names, so callers can reuse it
+    without re-scanning the skills directory.
+    """
     skills_src = install_dir / "skills"
     skills_dest = Path.home() / ".claude" / "skills"
 
     if not skills_src.exists():
-        return 0
+        return []
 
     # Check if Claude Code CLI is installed
     if not is_claude_code_installed():
         print("\n📝 Skipping Claude Code skills (CLI not installed)")
         print("   Skills are available in: {}/skills/".format(install_dir))
-        return 0
+        return []
+
+    import shutil
 
     print("\n🎯 Installing Claude Code Skills...")
     print("   (This installs skills for Claude Code CLI only)")
     skills_dest.mkdir(parents=True, exist_ok=True)
 
-    count = 0
-    for skill_file in skills_src.glob("*.md"):
-        dest_file = skills_dest / skill_file.name
-        shutil.copy(skill_file, dest_file)
-        print(f"  Installed: {skill_file.name}")
-        count += 1
+    from concurrent.futures import ThreadPoolExecutor
+
+    # copyfile (not copy) - skills are plain-text data, so skip the
+    # extra stat/chmod and let the os.sendfile fast path do the copy.
+    # The copies are independent, so run them in parallel and report
+    # once the batch completes.
+    skill_files = list_skill_files(skills_src)
+
+    def copy_one(entry):
+        shutil.copyfile(entry.path, skills_dest / entry.name)
+        return entry.name
 
-    return count
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        installed = list(executor.map(copy_one, skill_files))
+
+    # One summary write instead of a flush per file
+    if installed:
+        sys.stdout.write("".join(f"  Installed: {name}\n" for name in installed))
+
+    return installed
 
 
 def run_linkedin_oauth_setup(install_dir):
     """Run the LinkedIn OAuth setup script interactively."""
+    import subprocess
+
     linkedin_dir = install_dir / "peeperfrog-linkedin-mcp"
     oauth_script = linkedin_dir / "src" / "oauth_setup.py"
     venv_python = linkedin_dir / "venv" / "bin" / "python3"
@@ -1435,14 +1841,16 @@ def run_linkedin_oauth_setup(install_dir):
         return False
 
 
-def print_claude_desktop_skills_instructions(install_dir, is_update=False):
-    """Print instructions for installing/updating skills in Claude Desktop."""
-    skills_src = install_dir / "skills"
-    if not skills_src.exists():
-        return
+def print_claude_desktop_skills_instructions(install_dir, is_update=False, skill_names=None):
+    """Print instructions for installing/updating skills in Claude Desktop.
 
-    skill_files = list(skills_src.glob("*.md"))
-    if not skill_files:
+    Pass skill_names (e.g. the return of install_skills) to skip the
+    directory scan; this function is then pure formatting.
+    """
+    skills_src = install_dir / "skills"
+    if skill_names is None:
+        skill_names = [e.name for e in list_skill_files(skills_src)]
+    if not skill_names:
         return
 
     print("\n" + "-" * 60)
@@ -1476,51 +1884,81 @@ def print_restart_instructions(mcp_updated=False, skills_updated=False, install_
     if not mcp_updated and not skills_updated:
         return
 
-    print("\n" + "=" * 60)
-    print("🔄 To Apply Changes")
-    print("=" * 60)
+    # Build the whole block and write it once - one syscall instead of
+    # a line-buffered write per print
+    out = []
+    out.append("\n" + "=" * 60)
+    out.append("🔄 To Apply Changes")
+    out.append("=" * 60)
 
     # Claude Code instructions
-    print("\n📟 Claude Code (CLI):")
+    out.append("\n📟 Claude Code (CLI):")
     if mcp_updated:
-        print("  MCP servers were updated. You must restart Claude Code:")
-        print("    1. Exit your current session (Ctrl+C or type /exit)")
-        print("    2. Run: claude")
+        out.append("  MCP servers were updated. You must restart Claude Code:")
+        out.append("    1. Exit your current session (Ctrl+C or type /exit)")
+        out.append("    2. Run: claude")
     if skills_updated and not mcp_updated:
-        print("  Skills are loaded fresh each session - just start a new session.")
+        out.append("  Skills are loaded fresh each session - just start a new session.")
 
     # Claude Desktop instructions (only if MCP was updated or skills need uploading)
     if mcp_updated:
-        print("\n📱 Claude Desktop (GUI app):")
-        print("  MCP servers were updated. You must restart Claude Desktop:")
+        out.append("\n📱 Claude Desktop (GUI app):")
+        out.append("  MCP servers were updated. You must restart Claude Desktop:")
 
         if os_type == "macos":
-            print("    1. Quit completely: Cmd+Q or right-click dock icon > Quit")
-            print("    2. Relaunch Claude Desktop")
+            out.append("    1. Quit completely: Cmd+Q or right-click dock icon > Quit")
+            out.append("    2. Relaunch Claude Desktop")
         elif os_type == "windows":
-            print("    1. Quit completely: Right-click system tray icon > Exit")
-            print("    2. Relaunch Claude Desktop")
+            out.append("    1. Quit completely: Right-click system tray icon > Exit")
+            out.append("    2. Relaunch Claude Desktop")
         else:  # Linux
-            print("    1. Quit completely: Right-click system tray icon > Quit")
-            print("    2. Relaunch Claude Desktop")
+            out.append("    1. Quit completely: Right-click system tray icon > Quit")
+            out.append("    2. Relaunch Claude Desktop")
 
     if skills_updated and install_dir:
         skills_src = install_dir / "skills"
-        print("\n  To update skills in Claude Desktop:")
-        print("    1. Open Settings > Capabilities")
-        print("    2. Delete old versions of updated skills")
-        print("    3. Click 'Add' > 'Upload a skill'")
-        print(f"    4. Upload from: {skills_src}")
+        out.append("\n  To update skills in Claude Desktop:")
+        out.append("    1. Open Settings > Capabilities")
+        out.append("    2. Delete old versions of updated skills")
+        out.append("    3. Click 'Add' > 'Upload a skill'")
+        out.append(f"    4. Upload from: {skills_src}")
+
+    out.append("")
+    out.append("=" * 60)
+    sys.stdout.write("\n".join(out) + "\n")
 
-    print()
-    print("=" * 60)
 
+# Memoized process scan - valid for the duration of one setup run
+_claude_processes = None
+
+
+def find_claude_processes(refresh=False):
+    """Find running Claude Code processes (cached per run)."""
+    global _claude_processes
+    if _claude_processes is not None and not refresh:
+        return _claude_processes
 
-def find_claude_processes():
-    """Find running Claude Code processes."""
     processes = []
+
+    # On Linux, walk /proc directly - no fork/exec or text parsing needed
+    if os.path.isdir("/proc"):
+        for entry in os.scandir("/proc"):
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(os.path.join(entry.path, "comm")) as f:
+                    comm = f.read()
+            except OSError:
+                continue  # process exited or not readable
+            if "claude" in comm.lower():
+                processes.append(int(entry.name))
+        _claude_processes = processes
+        return processes
+
+    import subprocess
+
     try:
-        # Try pgrep first (Linux/macOS)
+        # Fall back to pgrep (macOS)
         result = subprocess.run(
             ["pgrep", "-f", "claude"],
             capture_output=True,
@@ -1531,29 +1969,30 @@ def find_claude_processes():
                 if pid:
                     processes.append(int(pid))
     except FileNotFoundError:
-        # pgrep not available, try ps
+        # pgrep not available, try ps with just the pid/comm columns -
+        # far less output than ps aux, and one compiled regex over the
+        # raw bytes replaces per-line lower()/split() allocations.
+        import re
         try:
             result = subprocess.run(
-                ["ps", "aux"],
-                capture_output=True,
-                text=True
+                ["ps", "-Ao", "pid,comm"],
+                capture_output=True
             )
-            for line in result.stdout.split("\n"):
-                if "claude" in line.lower() and "python" not in line.lower():
-                    parts = line.split()
-                    if len(parts) > 1:
-                        try:
-                            processes.append(int(parts[1]))
-                        except ValueError:
-                            pass
+            ps_re = re.compile(rb"^\s*(\d+)\s+.*claude", re.I | re.M)
+            for m in ps_re.finditer(result.stdout):
+                if b"python" not in m.group(0).lower():
+                    processes.append(int(m.group(1)))
         except Exception:
             pass
 
+    _claude_processes = processes
     return processes
 
 
 def restart_claude_code():
     """Attempt to restart Claude Code."""
+    import signal
+
     print("\n🔄 Restarting Claude Code...")
 
     # Find Claude processes
@@ -1564,16 +2003,35 @@ def restart_claude_code():
         print("  Start Claude Code manually when ready.")
         return False
 
-    # Kill existing processes
-    killed = 0
+    # Group PIDs by process group - processes spawned from one session
+    # share a pgid, so one killpg replaces N kill syscalls
+    pgroups = {}
     for pid in processes:
         try:
-            os.kill(pid, signal.SIGTERM)
-            killed += 1
-            print(f"  Stopped process {pid}")
+            pgroups.setdefault(os.getpgid(pid), []).append(pid)
         except (OSError, ProcessLookupError):
             pass
 
+    own_pgid = os.getpgid(0)
+    killed = 0
+    for pgid, pids in pgroups.items():
+        try:
+            if pgid == own_pgid:
+                raise PermissionError  # never killpg our own group
+            os.killpg(pgid, signal.SIGTERM)
+            killed += len(pids)
+            for pid in pids:
+                print(f"  Stopped process {pid}")
+        except (OSError, PermissionError, ProcessLookupError):
+            # Fall back to signalling each process individually
+            for pid in pids:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                    killed += 1
+                    print(f"  Stopped process {pid}")
+                except (OSError, ProcessLookupError):
+                    pass
+
     if killed > 0:
         print(f"  Stopped {killed} Claude process(es).")
         print()
@@ -1586,8 +2044,27 @@ def restart_claude_code():
     return False
 
 
+# Set by main(): False when stdin isn't a TTY or the run is flag-driven
+# (--update/--restart/--repair/--health), so prompts short-circuit to
+# their defaults instead of blocking on input()
+INTERACTIVE = True
+
+
+def prompt_input(prompt, default=""):
+    """Prompt for free-form input; returns default when non-interactive
+    or when stdin runs dry, so piped runs never block or crash."""
+    if not INTERACTIVE:
+        return default
+    try:
+        return input(prompt).strip()
+    except EOFError:
+        return default
+
+
 def prompt_yes_no(question, default=True):
     """Prompt user for yes/no answer."""
+    if not INTERACTIVE:
+        return default
     default_str = "Y/n" if default else "y/N"
     response = input(f"{question} [{default_str}]: ").strip().lower()
     if not response:
@@ -1597,6 +2074,8 @@ def prompt_yes_no(question, default=True):
 
 def prompt_selection(options, prompt_text):
     """Prompt user to select from options."""
+    if not INTERACTIVE:
+        return list(options.keys())
     print(f"\n{prompt_text}")
     for i, (key, config) in enumerate(options.items(), 1):
         print(f"  {i}. {config['name']} - {config.get('description', '')}")
@@ -1646,6 +2125,8 @@ The setup will guide you through getting each credential.
 
 def setup_batch_checker_cron(install_dir):
     """Set up cron job for automatic batch job checking."""
+    import subprocess
+
     print("\n📅 Setting up automated batch job checker...")
 
     # Load config to get interval setting
@@ -1753,6 +2234,8 @@ def setup_batch_checker_cron(install_dir):
 
 def remove_batch_checker_cron():
     """Remove the batch checker cron job."""
+    import subprocess
+
     try:
         # Get current crontab
         result = subprocess.run(
@@ -1805,6 +2288,10 @@ def main():
     do_repair = "--repair" in sys.argv
     health_only = "--health" in sys.argv
 
+    # Flag-driven and piped runs take prompt defaults without touching stdin
+    global INTERACTIVE
+    INTERACTIVE = sys.stdin.isatty() and not (update_only or do_restart or do_repair or health_only)
+
     # Determine install directory
     install_dir = DEFAULT_INSTALL_DIR
 
@@ -1823,7 +2310,7 @@ def main():
 
     # Track if we need to suggest restart
     needs_restart = False
-    skills_installed = 0
+    skills_installed = []
 
     # Track what changed for context-aware instructions
     mcp_updated = False
@@ -1864,6 +2351,8 @@ def main():
                             print(f"\n⚠️  {MCP_SERVERS[server_id]['name']}: Manual repair needed")
                             for issue in result["issues"]:
                                 print(f"      • {issue}")
+                    # Repairs may have restored files/directories
+                    clear_dir_cache()
         else:
             print("  ✅ All servers healthy")
 
@@ -1872,69 +2361,95 @@ def main():
             print("\n✅ Health check complete!")
             return 0
 
-        # Store hashes of files before pull to detect changes
-        req_hashes_before = {}
-        for server_id, config in MCP_SERVERS.items():
-            if "requirements_file" in config:
-                req_file = install_dir / server_id / config["requirements_file"]
-                req_hashes_before[server_id] = get_file_hash(req_file)
-
-        # Store hashes of MCP server scripts
-        server_hashes_before = {}
-        for server_id, config in MCP_SERVERS.items():
-            server_script = install_dir / server_id / config["server_script"]
-            server_hashes_before[server_id] = get_file_hash(server_script)
-
-        # Store hashes of skill files
-        skills_src = install_dir / "skills"
-        skill_hashes_before = {}
-        if skills_src.exists():
-            for skill_file in skills_src.glob("*.md"):
-                skill_hashes_before[skill_file.name] = get_file_hash(skill_file)
-
-        # Pull updates
-        if not git_pull(install_dir):
+        # Record HEAD before the pull so git itself can tell us what changed
+        head_before = run_command(["git", "rev-parse", "HEAD"], cwd=install_dir, capture=True)
+
+        # Start the pull, then overlap the network wait with local prep
+        pull = git_pull(install_dir, async_=True)
+        if isinstance(pull, PullHandle):
+            # Warm the parsed-config cache the missing-servers check reads later
+            desktop_warm_path = get_claude_desktop_config_path()
+            if desktop_warm_path:
+                read_config_file(desktop_warm_path)
+            pull = finish_git_pull(pull)
+        if not pull:
             print("\n❌ Failed to update. Please check your git configuration.")
             return 1
 
+        # The pull may have added or rewritten files
+        clear_dir_cache()
+
+        # One git diff replaces per-file stat/hash passes: map each changed
+        # path to its status letter (A=added, M=modified, ...). An
+        # up-to-date fast path means nothing moved - skip the diff too.
+        # --no-renames keeps every entry a single-path line; otherwise a
+        # rename comes through as R100<TAB>old<TAB>new and neither path
+        # would key correctly.
+        changed = {}
+        if pull != "up-to-date" and head_before.ok:
+            diff = run_command(
+                ["git", "diff", "--name-status", "--no-renames", head_before.stdout, "HEAD"],
+                cwd=install_dir, capture=True
+            )
+            if diff.ok:
+                for line in diff.stdout.splitlines():
+                    status, _, path = line.partition("\t")
+                    changed[path] = status[:1]
+
         # Check if requirements changed
-        deps_changed = False
-        for server_id, hash_before in req_hashes_before.items():
-            config = MCP_SERVERS[server_id]
-            req_file = install_dir / server_id / config["requirements_file"]
-            if get_file_hash(req_file) != hash_before:
-                deps_changed = True
+        deps_changed_servers = []
+        for server_id, rel_path in _SERVER_REQ_PATH.items():
+            if rel_path in changed:
+                deps_changed_servers.append(server_id)
                 mcp_updated = True
-                print(f"\n📦 Dependencies changed for {config['name']}")
+                print(f"\n📦 Dependencies changed for {MCP_SERVERS[server_id]['name']}")
 
         # Check if server scripts changed
-        for server_id, hash_before in server_hashes_before.items():
-            config = MCP_SERVERS[server_id]
-            server_script = install_dir / server_id / config["server_script"]
-            if get_file_hash(server_script) != hash_before:
+        for server_id, rel_path in _SERVER_SCRIPT_PATH.items():
+            if rel_path in changed:
                 mcp_updated = True
-                print(f"\n📝 Server code changed for {config['name']}")
+                print(f"\n📝 Server code changed for {MCP_SERVERS[server_id]['name']}")
 
         # Check if skills changed
-        if skills_src.exists():
-            for skill_file in skills_src.glob("*.md"):
-                old_hash = skill_hashes_before.get(skill_file.name)
-                new_hash = get_file_hash(skill_file)
-                if old_hash != new_hash:
-                    skills_updated = True
-                    if old_hash is None:
-                        print(f"\n🆕 New skill: {skill_file.name}")
-                    else:
-                        print(f"\n📝 Skill updated: {skill_file.name}")
+        skills_src = install_dir / "skills"
+        for entry in list_skill_files(skills_src):
+            status = changed.get(f"skills/{entry.name}")
+            if status:
+                skills_updated = True
+                if status == "A":
+                    print(f"\n🆕 New skill: {entry.name}")
+                else:
+                    print(f"\n📝 Skill updated: {entry.name}")
 
-        # Update dependencies if changed
-        if deps_changed:
+        # Update dependencies, but only the venvs whose requirements the
+        # pull actually touched - each pip launch costs seconds of fixed
+        # startup and resolution before any install work
+        if deps_changed_servers:
             print("\n🔄 Updating dependencies...")
-            for server_id in MCP_SERVERS:
-                mcp_dir = install_dir / server_id
-                if mcp_dir.exists():
-                    print(f"\n  {MCP_SERVERS[server_id]['name']}:")
-                    install_dependencies(mcp_dir, MCP_SERVERS[server_id])
+
+            # Shared-venv installs refresh the one environment; servers
+            # still on their own real venv dir get individual updates
+            if shared_venv_dir(install_dir).exists():
+                setup_shared_venv(install_dir)
+                deps_changed_servers = [
+                    sid for sid in deps_changed_servers
+                    if not (install_dir / sid / "venv").is_symlink()
+                ]
+
+            installed_dirs = {e.name for e in scan_dir(install_dir) if e.is_dir()}
+            to_update = [sid for sid in deps_changed_servers if sid in installed_dirs]
+
+            def _update_one(server_id):
+                log = [f"\n  {MCP_SERVERS[server_id]['name']}:"]
+                install_dependencies(install_dir / server_id, MCP_SERVERS[server_id], log=log)
+                print("\n".join(log))
+
+            if to_update:
+                from concurrent.futures import ThreadPoolExecutor
+
+                # Independent venvs - run the pip installs concurrently
+                with ThreadPoolExecutor(max_workers=len(to_update)) as executor:
+                    list(executor.map(_update_one, to_update))
 
         # Update skills (only if skill files changed or new ones added)
         if skills_updated:
@@ -1967,7 +2482,7 @@ def main():
                         if prompt_yes_no("\n  Enable automated batch job checker?", default=True):
                             # Prompt for interval
                             while True:
-                                interval_input = input("\n  Check interval in minutes (5-1440, default 30): ").strip()
+                                interval_input = prompt_input("\n  Check interval in minutes (5-1440, default 30): ")
                                 if not interval_input:
                                     interval = 30
                                     break
@@ -2014,23 +2529,24 @@ def main():
         if not update_only:
             desktop_config_path = get_claude_desktop_config_path()
             if desktop_config_path:
-                config = read_config_file(desktop_config_path)
-                mcp_servers = config.get("mcpServers", {}) if config else {}
+                # Reuse the last run's scan when the config hasn't changed
+                state = read_setup_state(install_dir)
+                try:
+                    config_mtime = desktop_config_path.stat().st_mtime_ns
+                except OSError:
+                    config_mtime = None
+                if config_mtime is not None and state.get("config_mtime_ns") == config_mtime:
+                    mcp_servers = set(state.get("configured_servers", []))
+                else:
+                    config = read_config_file(desktop_config_path)
+                    mcp_servers = config.get("mcpServers", {}) if config else {}
 
                 # Check which installed servers are missing from config
                 missing_servers = []
+                installed_dirs = {e.name for e in scan_dir(install_dir) if e.is_dir()}
                 for server_id in MCP_SERVERS:
-                    mcp_dir = install_dir / server_id
-                    if mcp_dir.exists():
-                        # Map server_id to config name
-                        if server_id == "peeperfrog-create-mcp":
-                            config_name = "peeperfrog-create"
-                        elif server_id == "peeperfrog-linkedin-mcp":
-                            config_name = "peeperfrog-linkedin"
-                        else:
-                            config_name = server_id.replace("-mcp", "")
-
-                        if config_name not in mcp_servers:
+                    if server_id in installed_dirs:
+                        if _SERVER_CONFIG_NAME[server_id] not in mcp_servers:
                             missing_servers.append(server_id)
 
                 if missing_servers:
@@ -2042,6 +2558,8 @@ def main():
                         offer_config_setup(install_dir, missing_servers)
                         mcp_updated = True
 
+                write_setup_state(install_dir, desktop_config_path)
+
         # Setup batch checker cron job (if image server is installed and not already set up)
         image_mcp_dir = install_dir / "peeperfrog-create-mcp"
         if image_mcp_dir.exists() and not update_only and not health_only and not batch_cron_already_setup:
@@ -2102,31 +2620,18 @@ def main():
             print("Run this script again when you're ready to set up the servers.")
             return 0
 
-        # Set up each selected MCP
-        for server_id in servers_to_setup:
-            server_config = MCP_SERVERS[server_id]
-            mcp_dir = install_dir / server_id
-
-            print(f"\n🔧 Setting up {server_config['name']}...")
-
-            if not mcp_dir.exists():
-                print(f"  Warning: {server_id} directory not found")
-                continue
+        # Build the shared environment once, then finish the per-server
+        # setup (venv link + config) concurrently - those steps are
+        # independent and I/O-bound.
+        from concurrent.futures import ThreadPoolExecutor
 
-            # Create venv
-            if not setup_venv(mcp_dir):
-                print(f"  Failed to create virtual environment")
-                continue
-
-            # Install dependencies
-            if not install_dependencies(mcp_dir, server_config):
-                print(f"  Failed to install dependencies")
-                continue
-
-            # Set up config
-            setup_config(mcp_dir, server_config)
+        print("\n🔧 Building shared environment...")
+        if not setup_shared_venv(install_dir):
+            print("  ❌ Failed to set up shared environment")
+            return 1
 
-            print(f"  ✅ {server_config['name']} ready!")
+        with ThreadPoolExecutor(max_workers=len(servers_to_setup)) as executor:
+            list(executor.map(lambda sid: setup_server(install_dir, sid), servers_to_setup))
 
         # Offer to configure MCP servers in config file
         if not update_only:
@@ -2138,9 +2643,11 @@ def main():
                 if prompt_yes_no("\nInstall Claude Code Skills?"):
                     skills_installed = install_skills(install_dir)
                     skills_updated = True
-                    print_claude_desktop_skills_instructions(install_dir, is_update=False)
+                    print_claude_desktop_skills_instructions(
+                        install_dir, is_update=False, skill_names=skills_installed
+                    )
                     # Pause so user can read the info
-                    input("\nPress Enter to continue...")
+                    prompt_input("\nPress Enter to continue...")
 
         print("\n✅ Installation complete!")
 
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Shared import helper for the image_server module under test.
+
+Importing image_server needs a config.json next to the package plus the
+real pricing table, and the module lives in a hyphen-free src dir that
+has to be put on sys.path. Doing that dance per test module repeats the
+temp-dir setup and a ~100 ms import for every file that wants the
+module; load() does it once per interpreter and hands every caller the
+same module object. Kept as a plain helper (not a pytest fixture) so the
+test modules still run under bare unittest.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_HERE = Path(__file__).resolve().parent
+_MCP_DIR = _HERE.parent / "peeperfrog-create-mcp"
+_MCP_SRC = _MCP_DIR / "src"
+_CONFIG_JSON = _MCP_DIR / "config.json"
+
+# One interpreter-scoped images dir shared by every module that loads
+# image_server; TemporaryDirectory cleans itself up at shutdown
+_images_td = tempfile.TemporaryDirectory()
+
+
+def mock_config():
+    tmpdir = _images_td.name
+    return {
+        "images_dir": tmpdir,
+        "batch_subdir": "batch",
+        "queue_filename": "batch_queue.json",
+        "batch_manager_script": "./src/batch_manager.py",
+        "batch_generate_script": "./src/batch_generate.py",
+        "webp_convert_script": "./scripts/webp-convert.py",
+        "max_reference_images": 14,
+        "api_delay_seconds": 3,
+        "batch_dir": os.path.join(tmpdir, "batch"),
+        "queue_file": os.path.join(tmpdir, "batch_queue.json"),
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def load_pricing():
+    with open(_MCP_DIR / "pricing.json", "r") as f:
+        return json.load(f)
+
+
+def _cleanup(created_config):
+    if created_config and _CONFIG_JSON.exists():
+        os.remove(_CONFIG_JSON)
+    _images_td.cleanup()
+
+
+@functools.lru_cache(maxsize=1)
+def load():
+    """Import image_server once per interpreter, with a temp config and
+    the real pricing table, and return the module."""
+    sys.modules.pop("image_server", None)
+    sys.path.insert(0, _MCP_SRC.as_posix())
+
+    created_config = False
+    if not _CONFIG_JSON.exists():
+        created_config = True
+        # Serialize once and write the whole buffer in one syscall
+        payload = json.dumps(mock_config()).encode()
+        fd = os.open(_CONFIG_JSON, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.write(fd, payload)
+        os.close(fd)
+
+    # atexit rather than tearDownModule so cleanup runs exactly once no
+    # matter how many modules share the loaded module
+    atexit.register(_cleanup, created_config)
+
+    import image_server
+
+    # Restore PRICING from real pricing.json
+    image_server.PRICING = load_pricing()
+    return image_server
@@ -1,36 +1,58 @@
 #!/usr/bin/env python3
 """Tests for batch_manager.py (peeperfrog-create-mcp version) - all pure utility, no API keys."""
 
+import atexit
 import os
 import sys
 import json
 import tempfile
-import shutil
 import unittest
 from unittest.mock import patch
-
-# Create temp queue file location
-_tmpdir = tempfile.mkdtemp()
+from pathlib import Path
+
+# Use orjson for parsing when available - same fallback pattern as setup.py
+try:
+    import orjson
+
+    def _loads_file(path):
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+except ImportError:
+    def _loads_file(path):
+        with open(path) as f:
+            return json.load(f)
+
+# Repo-relative paths, resolved once instead of re-joined per use
+_HERE = Path(__file__).resolve().parent
+_MCP_DIR = _HERE.parent / "peeperfrog-create-mcp"
+
+# Create temp queue file location; TemporaryDirectory cleans itself up
+# even if tearDownModule never runs
+_tmp = tempfile.TemporaryDirectory()
+_tmpdir = _tmp.name
 _queue_file = os.path.join(_tmpdir, "batch_queue.json")
 
 # Create temp config for module import
-_config_json_path = os.path.join(os.path.dirname(__file__), "..", "peeperfrog-create-mcp", "config.json")
+_config_json_path = _MCP_DIR / "config.json"
 _created_config = False
 if not os.path.exists(_config_json_path):
     _created_config = True
-    with open(_config_json_path, "w") as f:
-        json.dump({
-            "images_dir": _tmpdir,
-            "batch_subdir": "batch",
-            "queue_filename": "batch_queue.json",
-            "batch_manager_script": "./src/batch_manager.py",
-            "batch_generate_script": "./src/batch_generate.py",
-            "webp_convert_script": "./scripts/webp-convert.py",
-            "max_reference_images": 14,
-            "api_delay_seconds": 3,
-        }, f)
-
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "peeperfrog-create-mcp", "src"))
+    # Serialize once and write the whole buffer in one syscall
+    _payload = json.dumps({
+        "images_dir": _tmpdir,
+        "batch_subdir": "batch",
+        "queue_filename": "batch_queue.json",
+        "batch_manager_script": "./src/batch_manager.py",
+        "batch_generate_script": "./src/batch_generate.py",
+        "webp_convert_script": "./scripts/webp-convert.py",
+        "max_reference_images": 14,
+        "api_delay_seconds": 3,
+    }).encode()
+    _fd = os.open(_config_json_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.write(_fd, _payload)
+    os.close(_fd)
+
+sys.path.insert(0, (_MCP_DIR / "src").as_posix())
 import batch_manager
 
 # Override the module's QUEUE_FILE to use our temp
@@ -42,12 +64,12 @@ class TestBatchManager(unittest.TestCase):
         """Reset queue before each test."""
         if os.path.exists(_queue_file):
             os.remove(_queue_file)
+        batch_manager._reload()
 
     def test_ensure_queue_exists_creates_file(self):
         batch_manager.ensure_queue_exists()
         self.assertTrue(os.path.exists(_queue_file))
-        with open(_queue_file) as f:
-            data = json.load(f)
+        data = _loads_file(_queue_file)
         self.assertEqual(data, {"prompts": []})
 
     def test_add_to_queue_basic(self):
@@ -89,15 +111,13 @@ class TestBatchManager(unittest.TestCase):
         )
         self.assertTrue(result["success"])
         # Verify stored in queue file
-        with open(_queue_file) as f:
-            queue = json.load(f)
+        queue = _loads_file(_queue_file)
         self.assertIn("gemini_opts", queue["prompts"][0])
 
     def test_add_to_queue_with_model(self):
         result = batch_manager.add_to_queue("A photo", provider="together", model="dreamshaper")
         self.assertTrue(result["success"])
-        with open(_queue_file) as f:
-            queue = json.load(f)
+        queue = _loads_file(_queue_file)
         self.assertEqual(queue["prompts"][0]["model"], "dreamshaper")
 
     def test_add_multiple_items(self):
@@ -175,8 +195,7 @@ class TestBatchManager(unittest.TestCase):
             quality="fast",
             provider="openai",
         )
-        with open(_queue_file) as f:
-            queue = json.load(f)
+        queue = _loads_file(_queue_file)
         entry = queue["prompts"][0]
         self.assertEqual(entry["prompt"], "Full test")
         self.assertEqual(entry["filename"], "full.png")
@@ -187,10 +206,15 @@ class TestBatchManager(unittest.TestCase):
         self.assertIn("added_at", entry)
 
 
-def tearDownModule():
+# atexit rather than tearDownModule so cleanup runs exactly once at
+# interpreter shutdown regardless of how the runner discovers this file
+def _cleanup():
     if _created_config and os.path.exists(_config_json_path):
         os.remove(_config_json_path)
-    shutil.rmtree(_tmpdir, ignore_errors=True)
+    _tmp.cleanup()
+
+
+atexit.register(_cleanup)
 
 
 if __name__ == "__main__":
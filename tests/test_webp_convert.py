@@ -6,9 +6,10 @@ import sys
 import tempfile
 import shutil
 import unittest
+from pathlib import Path
 
-# Add tools dir to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+# The converter lives in peeperfrog-create-mcp/scripts; resolve once
+_SCRIPT_PATH = Path(__file__).resolve().parent.parent / "peeperfrog-create-mcp" / "scripts" / "webp-convert.py"
 
 # Need pillow for tests - same as the script requires
 try:
@@ -17,32 +18,61 @@ try:
 except ImportError:
     HAS_PILLOW = False
 
+# numpy is a dependency of the script under test; used here to build
+# fixture images without per-pixel Python loops
+import numpy as np
+
 # Import the module (file has a hyphen, so use importlib)
 import importlib.util
-spec = importlib.util.spec_from_file_location(
-    "webp_convert",
-    os.path.join(os.path.dirname(__file__), "..", "tools", "webp-convert.py"),
-)
+spec = importlib.util.spec_from_file_location("webp_convert", _SCRIPT_PATH)
 webp_convert = importlib.util.module_from_spec(spec)
+# Register under its module name so batch_convert's process pool can
+# pickle functions defined in it
+sys.modules["webp_convert"] = webp_convert
 spec.loader.exec_module(webp_convert)
 
 
 @unittest.skipUnless(HAS_PILLOW, "Pillow not installed")
 class TestConvertToWebp(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Encode the common fixtures once; tests get hardlinks instead
+        # of paying a fresh PNG/JPEG encode per method
+        cls._templates = tempfile.TemporaryDirectory()
+        cls._template_png = os.path.join(cls._templates.name, "template.png")
+        Image.new("RGB", (100, 100), color=(255, 0, 0)).save(cls._template_png, "PNG")
+        cls._template_jpg = os.path.join(cls._templates.name, "template.jpg")
+        Image.new("RGB", (100, 100), color=(0, 255, 0)).save(cls._template_jpg, "JPEG")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._templates.cleanup()
+
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
 
     def tearDown(self):
         shutil.rmtree(self.tmpdir)
 
+    def _link_template(self, template, path):
+        try:
+            os.link(template, path)  # hardlink skips the byte copy
+        except OSError:
+            shutil.copy(template, path)
+        return path
+
     def _create_png(self, name="test.png", size=(100, 100), mode="RGB"):
         path = os.path.join(self.tmpdir, name)
+        if size == (100, 100) and mode == "RGB":
+            return self._link_template(self._template_png, path)
         img = Image.new(mode, size, color=(255, 0, 0))
         img.save(path, "PNG")
         return path
 
     def _create_jpg(self, name="test.jpg", size=(100, 100)):
         path = os.path.join(self.tmpdir, name)
+        if size == (100, 100):
+            return self._link_template(self._template_jpg, path)
         img = Image.new("RGB", size, color=(0, 255, 0))
         img.save(path, "JPEG")
         return path
@@ -90,15 +120,12 @@ class TestConvertToWebp(unittest.TestCase):
         self.assertEqual(img.format, "WEBP")
 
     def test_quality_parameter(self):
-        # Use a larger, more complex image so quality differences are measurable
+        # Use a larger, more complex image so quality differences are measurable;
+        # built vectorized rather than 250k PixelAccess assignments
         png_path = os.path.join(self.tmpdir, "complex.png")
-        img = Image.new("RGB", (500, 500))
-        # Add varied pixel data so compression has something to work with
-        pixels = img.load()
-        for x in range(500):
-            for y in range(500):
-                pixels[x, y] = ((x * 7) % 256, (y * 13) % 256, ((x + y) * 3) % 256)
-        img.save(png_path, "PNG")
+        x, y = np.meshgrid(np.arange(500), np.arange(500), indexing="ij")
+        arr = np.stack([(x * 7) % 256, (y * 13) % 256, ((x + y) * 3) % 256], axis=-1).astype(np.uint8)
+        Image.fromarray(arr, "RGB").save(png_path, "PNG")
         low_q = os.path.join(self.tmpdir, "low.webp")
         high_q = os.path.join(self.tmpdir, "high.webp")
         webp_convert.convert_to_webp(png_path, output_path=low_q, quality=1)
@@ -106,6 +133,22 @@ class TestConvertToWebp(unittest.TestCase):
         # Lower quality should be smaller for complex images
         self.assertLess(os.path.getsize(low_q), os.path.getsize(high_q))
 
+    def test_max_size_drafts_jpeg(self):
+        jpg_path = self._create_jpg()
+        out_path = os.path.join(self.tmpdir, "draft.webp")
+        result = webp_convert.convert_to_webp(
+            jpg_path, output_path=out_path, skip_existing=False, max_size=(50, 50)
+        )
+        self.assertIsNotNone(result)
+        img = Image.open(out_path)
+        self.assertLessEqual(max(img.size), 50)
+
+    def test_fast_method(self):
+        png_path = self._create_png("fast.png")
+        result = webp_convert.convert_to_webp(png_path, skip_existing=False, method=0)
+        self.assertIsNotNone(result)
+        self.assertTrue(os.path.exists(result))
+
     def test_default_output_name(self):
         png_path = self._create_png("myimage.png")
         result = webp_convert.convert_to_webp(png_path)
@@ -129,8 +172,8 @@ class TestBatchConvert(unittest.TestCase):
         paths = []
         for i in range(count):
             path = os.path.join(self.tmpdir, f"image_{i}.png")
-            img = Image.new("RGB", (50, 50), color=(i * 50, 0, 0))
-            img.save(path, "PNG")
+            arr = np.full((50, 50, 3), (i * 50, 0, 0), dtype=np.uint8)
+            Image.fromarray(arr, "RGB").save(path, "PNG")
             paths.append(path)
         return paths
 